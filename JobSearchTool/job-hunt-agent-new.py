@@ -1,17 +1,96 @@
-from typing import Dict, List
+from typing import Dict, Iterator, List, Optional, Union
+import asyncio
+import concurrent.futures
+import functools
+import hashlib
+import json
+import math
+from diskcache import Cache
 from pydantic import BaseModel, Field
+import httpx
 import requests
-from firecrawl import FirecrawlApp
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from ratelimit import limits, sleep_and_retry
 import streamlit as st
 import os
-import opik
-from opik import track
+import threading
+import time
+from urllib.parse import quote, quote_plus
 from dotenv import load_dotenv
-opik.configure()
 
 # Load environment variables from .env file if it exists
 load_dotenv()
 
+# Opik tracing is opt-in, so a plain start never imports or configures it
+if os.getenv("OPIK_ENABLED", "").lower() in ("1", "true", "yes"):
+    import opik
+    from opik import track
+    opik.configure()
+else:
+    def track(func):
+        return func
+
+# Local cache for scraped data and model generations, shared across sessions
+cache = Cache(".cache", eviction_policy="least-recently-used")
+
+def _cache_key(namespace: str, **inputs) -> str:
+    raw = json.dumps(inputs, sort_keys=True)
+    return f"{namespace}:{hashlib.sha256(raw.encode()).hexdigest()}"
+
+def _env_rpm(name: str, default: int = 20) -> int:
+    # A malformed value falls back to the default; limits(calls=0) would make
+    # sleep_and_retry spin forever, so at least one call per minute is allowed
+    try:
+        return max(1, int(os.getenv(name, default)))
+    except ValueError:
+        return default
+
+# Client-side request budgets, so bursts wait briefly instead of hitting 429s.
+# Set these to your Firecrawl plan / HF endpoint limits (requests per minute).
+FIRECRAWL_RPM = _env_rpm("FIRECRAWL_RPM")
+HF_RPM = _env_rpm("HF_RPM")
+
+# Scrape each site with its own concurrent request instead of one batch job
+FIRECRAWL_ASYNC = os.getenv("FIRECRAWL_ASYNC", "").lower() in ("1", "true", "yes")
+
+@sleep_and_retry
+@limits(calls=FIRECRAWL_RPM, period=60)
+def _firecrawl_slot():
+    """Blocks until another Firecrawl request fits in the per-minute budget."""
+
+@sleep_and_retry
+@limits(calls=HF_RPM, period=60)
+def _hf_slot():
+    """Blocks until another Hugging Face request fits in the per-minute budget."""
+
+# Translation tables for turning search terms into URL slugs in a single pass
+_SLUG_TABLE = str.maketrans({" ": "-"})
+_UNDERSCORE_TABLE = str.maketrans({" ": "_"})
+
+def _compact_json(records: List[Dict]) -> str:
+    # Compact JSON without empty fields is far fewer tokens than the repr of
+    # the raw dicts, which shortens the prompt the model has to prefill
+    return json.dumps(
+        [{field: value for field, value in record.items() if value not in (None, "", [])} for record in records],
+        separators=(",", ":"),
+        ensure_ascii=False
+    )
+
+# Longest Retry-After (seconds) worth blocking the Streamlit script thread for
+MAX_RETRY_AFTER = 30
+
+def _retry_after(headers, default: float = 5.0) -> float:
+    try:
+        seconds = float(headers.get("Retry-After", default))
+    except ValueError:
+        return default
+    # Negative values would crash time.sleep and nan compares false against
+    # everything; inf is kept so it fails the MAX_RETRY_AFTER check
+    if math.isnan(seconds):
+        return default
+    return max(0.0, seconds)
+
 class DefineStructure(BaseModel):
     region: str = Field(description="Region or area where the job is located", default=None)
     role: str = Field(description="Specific role or function within the job category", default=None)
@@ -38,44 +117,209 @@ class FirecrawlResponse(BaseModel):
     status: str
     expiresAt: str
 
+# JSON schemas sent to Firecrawl, generated once instead of on every search
+_EXTRACT_SCHEMA = ExtractSchema.model_json_schema()
+_TRENDS_SCHEMA = IndustryTrendsSchema.model_json_schema()
+
+# Analysis prompts keep the fixed instructions first and the scraped data last,
+# so every request shares the same prefix for the endpoint's prompt caching
+JOB_PROMPT_TEMPLATE = """As a career expert, analyze the job opportunities listed at the end.
+INSTRUCTIONS:
+1. Select best matching 5-6 jobs.
+2. Provide:
+💼 SELECTED JOB OPPORTUNITIES
+- Job Title and Role
+- Region/Location
+- Experience Required
+- Pros and Cons
+- Job Link
+🔍 SKILLS MATCH ANALYSIS
+- Skills match
+- Experience fit
+- Growth potential
+💡 RECOMMENDATIONS
+- Top 3 jobs
+- Career growth
+📝 APPLICATION TIPS
+- Resume and strategy tips
+Jobs:
+{jobs}
+"""
+
+TRENDS_PROMPT_TEMPLATE = """Analyze the industry trends listed at the end and provide:
+📊 INDUSTRY TRENDS SUMMARY
+🔥 TOP SKILLS IN DEMAND
+📈 CAREER GROWTH OPPORTUNITIES
+🎯 RECOMMENDATIONS FOR JOB SEEKERS
+Trends for {job_category}:
+{industries}
+"""
+
 class JobSearchingAgent:
     def __init__(self, firecrawl_api_key: str, hf_api_key: str, model_url: str):
-        self.firecrawl = FirecrawlApp(api_key=firecrawl_api_key)
+        self.firecrawl_api_key = firecrawl_api_key
         self.hf_api_key = hf_api_key
         self.model_url = model_url
+        # Keep the TLS connection to the model endpoint warm across calls, and
+        # retry cold-start 503s and other server errors with backoff. 429s are
+        # left to _post_generation so a long Retry-After is only waited out once.
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=4,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=[500, 502, 503, 504],
+                allowed_methods=frozenset(["POST"]),
+                # urllib3 would otherwise sleep an uncapped Retry-After on 503s too
+                respect_retry_after_header=False,
+                raise_on_status=False
+            )
+        )
+        self._session.mount("https://", adapter)
 
-    @track
-    def _generate_text(self, prompt: str) -> str:
+    def __del__(self):
+        # Release the pooled connections once the agent is evicted from the cache
+        session = getattr(self, "_session", None)
+        if session is not None:
+            session.close()
+
+    @functools.cached_property
+    def firecrawl(self):
+        # Imported and built on first use, so the SDK only loads when a scrape needs it
+        from firecrawl import Firecrawl
+        return Firecrawl(api_key=self.firecrawl_api_key)
+
+    def _extract(self, urls: List[str], prompt: str, schema: Dict, key: str, wait_for: int = 0) -> List[Dict]:
+        # batch_scrape crawls the URLs concurrently on Firecrawl's side; each page
+        # gets its own extraction, so the per-site results are flattened here
+        _firecrawl_slot()
+        job = self.firecrawl.batch_scrape(
+            urls,
+            # JSON extraction only (no html/links/screenshots) over the main
+            # content keeps page rendering and the extracted payload small
+            formats=[{"type": "json", "prompt": prompt, "schema": schema}],
+            only_main_content=True,
+            wait_for=wait_for,
+            poll_interval=2,
+            wait_timeout=60
+        )
+        documents = job.get('data', []) if isinstance(job, dict) else getattr(job, 'data', None) or []
+        items = []
+        for document in documents:
+            extracted = document.get('json') if isinstance(document, dict) else getattr(document, 'json', None)
+            if isinstance(extracted, dict):
+                items.extend(extracted.get(key) or [])
+        return items
+
+    def _hf_request(self, prompt: str, stream: bool = False) -> Dict:
         headers = {
             "Authorization": f"Bearer {self.hf_api_key}",
-            "Content-Type": "application/json"
+            "Content-Type": "application/json",
+            "X-use-cache": "true"
         }
         payload = {
             "inputs": prompt,
-            "parameters": {"max_new_tokens": 800}
+            # Only the completion, not the prompt echoed back in generated_text
+            "parameters": {"max_new_tokens": 800, "return_full_text": False},
+            "options": {"use_cache": True}
         }
-        try:
-            response = requests.post(self.model_url, headers=headers, json=payload)
-            response.raise_for_status()
-            return response.json()[0]['generated_text']
-        except Exception as e:
-            return f"Error generating text: {e}"
+        if stream:
+            payload["stream"] = True
+        return {"headers": headers, "json": payload, "timeout": (5, 60), "stream": stream}
+
+    def _post_generation(self, prompt: str, stream: bool = False) -> requests.Response:
+        _hf_slot()
+        response = self._session.post(self.model_url, **self._hf_request(prompt, stream))
+        if response.status_code == 429 and _retry_after(response.headers) <= MAX_RETRY_AFTER:
+            # Wait out a short server backoff and retry once; longer waits fail
+            # fast so the UI can ask the user to try again later
+            response.close()
+            time.sleep(_retry_after(response.headers))
+            _hf_slot()
+            response = self._session.post(self.model_url, **self._hf_request(prompt, stream))
+        response.raise_for_status()
+        return response
 
     @track
-    def find_jobs(self, job_title: str, location: str, experience_years: int, skills: List[str]) -> str:
-        formatted_job_title = job_title.lower().replace(" ", "-")
-        formatted_location = location.lower().replace(" ", "-")
+    def _generate_text(self, prompt: str, stream: bool = False) -> Union[str, Iterator[str]]:
+        if stream:
+            return self._stream_text(prompt)
+        cache_key = _cache_key("generate", model_url=self.model_url, prompt=prompt)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+        # Request errors (timeouts, 401/403/429, ...) propagate so the UI can tell
+        # "retry" apart from "check your keys"
+        response = self._post_generation(prompt)
+        try:
+            text = response.json()[0]['generated_text']
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            return f"Error generating text: unexpected response from the model endpoint ({e})"
+        cache.set(cache_key, text, expire=3600)
+        return text
+
+    def _stream_text(self, prompt: str) -> Iterator[str]:
+        # Cached under its own namespace so a stream and a blocking generation
+        # of the same prompt never replay each other's partial or error state
+        cache_key = _cache_key("generate_stream", model_url=self.model_url, prompt=prompt)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+        chunks = []
+        response = self._post_generation(prompt, stream=True)
+        try:
+            with response:
+                if not response.headers.get("Content-Type", "").startswith("text/event-stream"):
+                    # The endpoint ignored "stream" and sent a regular JSON body
+                    body = response.json()
+                    if isinstance(body, list):
+                        body = body[0]
+                    chunks.append(body['generated_text'])
+                    yield chunks[-1]
+                else:
+                    for line in response.iter_lines():
+                        # Server-sent events: data:{"token": {"text": ..., "special": ...}, ...}
+                        if not line.startswith(b"data:"):
+                            continue
+                        event = json.loads(line[5:])
+                        if event.get("error"):
+                            raise ValueError(f"{event.get('error_type', 'error')}: {event['error']}")
+                        token = event.get("token") or {}
+                        if token.get("special"):
+                            continue
+                        chunks.append(token.get("text", ""))
+                        yield chunks[-1]
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+            yield f"Error generating text: unexpected stream from the model endpoint ({e})"
+            return
+        text = "".join(chunks)
+        if not text:
+            yield "Error generating text: the model endpoint returned no tokens."
+            return
+        cache.set(cache_key, text, expire=3600)
+
+    def _build_jobs_prompt(self, job_title: str, location: str, experience_years: int, skills: List[str]) -> Optional[str]:
+        # Escape user input so characters like /, &, ? or non-ASCII can't break the URLs
+        formatted_job_title = quote(job_title.lower().translate(_SLUG_TABLE), safe="")
+        formatted_location = quote(location.lower().translate(_SLUG_TABLE), safe="")
         skills_string = ", ".join(skills)
         urls = [
             f"https://www.naukri.com/{formatted_job_title}-jobs-in-{formatted_location}",
-            f"https://www.indeed.com/jobs?q={formatted_job_title}&l={formatted_location}",
-            f"https://www.monster.com/jobs/search/?q={formatted_job_title}&where={formatted_location}",
+            f"https://www.indeed.com/jobs?q={quote_plus(job_title)}&l={quote_plus(location)}",
+            f"https://www.monster.com/jobs/search/?q={quote_plus(job_title)}&where={quote_plus(location)}",
         ]
-        try:
-            raw_response = self.firecrawl.extract(
-                urls=urls,
-                params={
-                    'prompt': f"""Extract job postings by region, roles, job titles, and experience from these job sites.
+        cache_key = _cache_key(
+            "jobs", job_title=job_title, location=location,
+            experience_years=experience_years, skills=sorted(skills)
+        )
+        jobs = cache.get(cache_key)
+        if jobs is None:
+            jobs = self._extract(
+                urls,
+                prompt=f"""Extract job postings by region, roles, job titles, and experience from this job site.
                     Look for jobs that match these criteria:
                     - Job Title: Should be related to {job_title}
                     - Location: {location} (include remote jobs if available)
@@ -86,84 +330,167 @@ class JobSearchingAgent:
                     - region, role, job_title, experience, job_link
                     MAX 10 postings.
                     """,
-                    'schema': ExtractSchema.model_json_schema()
-                }
+                schema=_EXTRACT_SCHEMA,
+                key='job_postings',
+                wait_for=2000  # short settle time for SPA boards like Indeed
             )
-            if isinstance(raw_response, dict) and raw_response.get('success'):
-                jobs = raw_response['data'].get('job_postings', [])
-            else:
-                jobs = []
-            if not jobs:
-                return "No job listings found matching your criteria."
-
-            prompt = f"""As a career expert, analyze these job opportunities:
-Jobs:
-{jobs}
-INSTRUCTIONS:
-1. Select best matching 5-6 jobs.
-2. Provide:
-💼 SELECTED JOB OPPORTUNITIES
-- Job Title and Role
-- Region/Location
-- Experience Required
-- Pros and Cons
-- Job Link
-🔍 SKILLS MATCH ANALYSIS
-- Skills match
-- Experience fit
-- Growth potential
-💡 RECOMMENDATIONS
-- Top 3 jobs
-- Career growth
-📝 APPLICATION TIPS
-- Resume and strategy tips
-"""
-            return self._generate_text(prompt)
-        except Exception as e:
-            return f"An error occurred while searching for jobs: {str(e)}"
+            if jobs:
+                cache.set(cache_key, jobs, expire=1800)
+        if not jobs:
+            return None
+
+        return JOB_PROMPT_TEMPLATE.format(jobs=_compact_json(jobs))
+
+    @track
+    def find_jobs(self, job_title: str, location: str, experience_years: int, skills: List[str]) -> str:
+        prompt = self._build_jobs_prompt(job_title, location, experience_years, skills)
+        if prompt is None:
+            return "No job listings found matching your criteria."
+        return self._generate_text(prompt)
+
+    @track
+    def find_jobs_stream(self, job_title: str, location: str, experience_years: int, skills: List[str]) -> Iterator[str]:
+        prompt = self._build_jobs_prompt(job_title, location, experience_years, skills)
+        if prompt is None:
+            yield "No job listings found matching your criteria."
+            return
+        yield from self._generate_text(prompt, stream=True)
 
     @track
     def get_industry_trends(self, job_category: str) -> str:
         urls = [
-            f"https://www.payscale.com/research/US/Job={job_category.replace(' ', '_')}/Salary",
-            f"https://www.glassdoor.com/Salaries/{job_category.lower().replace(' ', '-')}-salary-SRCH_KO0,{len(job_category)}.htm"
+            f"https://www.payscale.com/research/US/Job={job_category.translate(_UNDERSCORE_TABLE)}/Salary",
+            f"https://www.glassdoor.com/Salaries/{job_category.lower().translate(_SLUG_TABLE)}-salary-SRCH_KO0,{len(job_category)}.htm"
         ]
-        try:
-            raw_response = self.firecrawl.extract(
-                urls=urls,
-                params={
-                    'prompt': f"""Extract industry trends data for the {job_category} industry.
+        cache_key = _cache_key("trends", job_category=job_category)
+        industries = cache.get(cache_key)
+        if industries is None:
+            industries = self._extract(
+                urls,
+                prompt=f"""Extract industry trends data for the {job_category} industry.
                     For each, extract:
                     - industry, avg_salary, growth_rate, demand_level, top_skills
                     3-5 roles/sub-categories.
                     """,
-                    'schema': IndustryTrendsSchema.model_json_schema()
-                }
+                schema=_TRENDS_SCHEMA,
+                key='industry_trends'
             )
-            if isinstance(raw_response, dict) and raw_response.get('success'):
-                industries = raw_response['data'].get('industry_trends', [])
-                if not industries:
-                    return f"No industry trends data available for {job_category}."
-                prompt = f"""Analyze these trends for {job_category}:
-{industries}
-📊 INDUSTRY TRENDS SUMMARY
-🔥 TOP SKILLS IN DEMAND
-📈 CAREER GROWTH OPPORTUNITIES
-🎯 RECOMMENDATIONS FOR JOB SEEKERS
-"""
-                return self._generate_text(prompt)
+            if industries:
+                cache.set(cache_key, industries, expire=1800)
+        if not industries:
             return f"No industry trends data available for {job_category}."
-        except Exception as e:
-            return f"An error occurred while fetching industry trends: {str(e)}"
-
-def job_agent_create():
-    if 'job_agent' not in st.session_state:
-        st.session_state.job_agent = JobSearchingAgent(
-            firecrawl_api_key=st.session_state.firecrawl_key,
-            hf_api_key=st.session_state.hf_key,
-            model_url=st.session_state.model_url
+        prompt = TRENDS_PROMPT_TEMPLATE.format(job_category=job_category, industries=_compact_json(industries))
+        return self._generate_text(prompt)
+
+_loop_lock = threading.Lock()
+_loop = None
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    # One event loop thread for the whole process, shared by every async agent
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, daemon=True).start()
+        return _loop
+
+class AsyncJobSearchingAgent(JobSearchingAgent):
+    """Scrapes each job site with its own concurrent Firecrawl request instead of one batch job."""
+
+    firecrawl_scrape_url = "https://api.firecrawl.dev/v2/scrape"
+
+    def __init__(self, firecrawl_api_key: str, hf_api_key: str, model_url: str, max_concurrency: int = 5):
+        super().__init__(firecrawl_api_key, hf_api_key, model_url)
+        self.max_concurrency = max_concurrency
+        # The shared background loop owns the AsyncClient, so its connection
+        # pool survives between searches and any thread can submit work
+        self._loop = _background_loop()
+        self._client = httpx.AsyncClient(
+            headers={
+                "Authorization": f"Bearer {firecrawl_api_key}",
+                "Content-Type": "application/json"
+            },
+            timeout=httpx.Timeout(60, connect=5)
         )
 
+    def __del__(self):
+        super().__del__()
+        client, loop = getattr(self, "_client", None), getattr(self, "_loop", None)
+        if client is not None and loop is not None and loop.is_running():
+            try:
+                asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            except RuntimeError:
+                pass
+
+    def _extract(self, urls: List[str], prompt: str, schema: Dict, key: str, wait_for: int = 0) -> List[Dict]:
+        future = asyncio.run_coroutine_threadsafe(self._extract_async(urls, prompt, schema, key, wait_for), self._loop)
+        return future.result()
+
+    async def _extract_async(self, urls: List[str], prompt: str, schema: Dict, key: str, wait_for: int = 0) -> List[Dict]:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def scrape(url: str) -> Dict:
+            payload = {
+                "url": url,
+                "formats": [{"type": "json", "prompt": prompt, "schema": schema}],
+                "onlyMainContent": True,
+                "waitFor": wait_for
+            }
+            async with semaphore:
+                await asyncio.to_thread(_firecrawl_slot)
+                response = await self._client.post(self.firecrawl_scrape_url, json=payload)
+                if response.status_code == 429 and _retry_after(response.headers) <= MAX_RETRY_AFTER:
+                    # Honour a short server backoff and retry this site once;
+                    # longer waits fall through to raise_for_status below
+                    await asyncio.sleep(_retry_after(response.headers))
+                    await asyncio.to_thread(_firecrawl_slot)
+                    response = await self._client.post(self.firecrawl_scrape_url, json=payload)
+            response.raise_for_status()
+            return (response.json().get("data") or {}).get("json") or {}
+
+        results = await asyncio.gather(*(scrape(url) for url in urls), return_exceptions=True)
+
+        # One unreachable site shouldn't discard what the others returned
+        extracted = [result for result in results if not isinstance(result, BaseException)]
+        if not extracted and results:
+            raise results[0]
+        items = []
+        for result in extracted:
+            items.extend(result.get(key) or [])
+        return items
+
+# Bounded so agents (and the API keys they hold) for credentials no longer in
+# use are dropped instead of piling up for the life of the process
+@st.cache_resource(max_entries=8, ttl=3600)
+def get_agent(firecrawl_key: str, hf_key: str, model_url: str) -> JobSearchingAgent:
+    # One agent per key/model combination, shared across sessions and reruns
+    # so its HTTP connection pools stay warm. Per-site async scraping is opt-in.
+    agent_class = AsyncJobSearchingAgent if FIRECRAWL_ASYNC else JobSearchingAgent
+    return agent_class(
+        firecrawl_api_key=firecrawl_key,
+        hf_api_key=hf_key,
+        model_url=model_url
+    )
+
+def _show_error(task: str, error: Exception):
+    # Tell transient failures (worth retrying) apart from bad keys or settings
+    try:
+        from firecrawl.v2.utils.error_handler import WebsiteNotSupportedError
+    except ImportError:
+        WebsiteNotSupportedError = ()
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(error, "status_code", None)
+    if isinstance(error, WebsiteNotSupportedError):
+        # Firecrawl reports unsupported sites as a 403, which isn't a key problem
+        st.warning(f"🚫 {task} couldn't scrape one of the job sites ({error}). Firecrawl doesn't support it.")
+    elif isinstance(error, (TimeoutError, requests.Timeout, requests.ConnectionError, httpx.TransportError)) or status in (408, 429, 500, 502, 503, 504):
+        # TimeoutError is what batch_scrape raises when wait_timeout runs out
+        st.warning(f"⏳ {task} failed temporarily ({error}). Please try again in a moment.")
+    elif status in (401, 402, 403):
+        st.error(f"🔑 {task} was rejected ({error}). Please check your API keys and plan in the sidebar.")
+    else:
+        st.error(f"❌ {task} failed: {error}")
+
 def main():
     st.set_page_config(page_title="AI Job Hunting Assistant", page_icon="💼", layout="wide")
     env_firecrawl_key = os.getenv("FIRECRAWL_API_KEY", "")
@@ -177,11 +504,9 @@ def main():
         hf_key = st.text_input("Hugging Face API Key", type="password", value=env_hf_key or "")
         firecrawl_key = st.text_input("Firecrawl API Key", type="password", value=env_firecrawl_key or "")
 
+        agent = None
         if firecrawl_key and hf_key and model_url:
-            st.session_state.firecrawl_key = firecrawl_key
-            st.session_state.hf_key = hf_key
-            st.session_state.model_url = model_url
-            job_agent_create()
+            agent = get_agent(firecrawl_key, hf_key, model_url)
         else:
             st.warning("⚠️ Please provide all required API keys and model URL.")
 
@@ -196,7 +521,7 @@ def main():
     with col2:
         experience_years = st.number_input("Experience (in years)", min_value=0, max_value=30, value=2)
         skills_input = st.text_area("Skills (comma separated)", placeholder="Python, SQL, React")
-        skills = [s.strip() for s in skills_input.split(",") if s.strip()]
+        skills = list(filter(None, map(str.strip, skills_input.split(","))))
 
     job_category = st.selectbox("Industry/Job Category", [
         "Information Technology", "Software Development", "Data Science", "Marketing",
@@ -204,7 +529,7 @@ def main():
     ])
 
     if st.button("🔍 Start Job Search", use_container_width=True):
-        if 'job_agent' not in st.session_state:
+        if agent is None:
             st.error("⚠️ Please enter your API keys in the sidebar first!")
             return
         if not job_title or not location:
@@ -212,25 +537,31 @@ def main():
             return
         if not skills:
             st.warning("⚠️ No skills provided. Adding skills will improve job matching.")
-        try:
-            with st.spinner("🔍 Searching for jobs..."):
-                job_results = st.session_state.job_agent.find_jobs(
-                    job_title=job_title,
-                    location=location,
-                    experience_years=experience_years,
-                    skills=skills
-                )
+        # Industry trends are fetched in the background while the job
+        # analysis streams in token by token; each part reports its own errors
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            trends_future = executor.submit(agent.get_industry_trends, job_category)
+            st.subheader("💼 Job Recommendations")
+            try:
+                with st.spinner("🔍 Searching for jobs..."):
+                    st.write_stream(agent.find_jobs_stream(
+                        job_title=job_title,
+                        location=location,
+                        experience_years=experience_years,
+                        skills=skills
+                    ))
                 st.success("✅ Job search completed!")
-                st.subheader("💼 Job Recommendations")
-                st.markdown(job_results)
-                st.divider()
+            except Exception as e:
+                _show_error("Job search", e)
+            st.divider()
+            try:
                 with st.spinner("📊 Analyzing industry trends..."):
-                    industry_trends = st.session_state.job_agent.get_industry_trends(job_category)
-                    st.success("✅ Industry analysis completed!")
-                    with st.expander(f"📈 {job_category} Industry Trends Analysis"):
-                        st.markdown(industry_trends)
-        except Exception as e:
-            st.error(f"❌ An error occurred: {str(e)}")
+                    industry_trends = trends_future.result()
+                st.success("✅ Industry analysis completed!")
+                with st.expander(f"📈 {job_category} Industry Trends Analysis"):
+                    st.markdown(industry_trends)
+            except Exception as e:
+                _show_error("Industry trends analysis", e)
 
 if __name__ == "__main__":
     main()